@@ -1,4 +1,8 @@
 import time as time
+import collections
+
+# the kinds of values stored in the transposition table
+EXACT, LOWER, UPPER = 0, 1, 2
 
 ##########################################################################################
 
@@ -41,143 +45,354 @@ class Minimax(object):
     """ An implementation of MiniMax Search
         - with data tracked for runtime or search effort
         - with search cut-off
-        - no transposition table
+        - with killer-move and history-heuristic move ordering
+        - as a negamax Principal Variation Search
+        - with iterative deepening and aspiration windows
+        - with a transposition table storing exact values or bounds, and best moves,
+          kept from one move to the next
+        - with a quiescence search of captures beyond the depth limit
+        - with null-move pruning and late move reductions
     """
 
     # a clumsy way to represent a large value
     ifny = 2**20
 
-    def __init__(self, game):
+    # half the width of the aspiration window around the previous iteration's value
+    aspiration = 5
+
+    # how many levels of captures the quiescence search may look past the depth limit
+    quiescence_limit = 6
+
+    # how many levels shallower the search goes after a null move
+    null_move_reduction = 2
+
+    # moves searched after this many, other than captures, are first tried one level
+    # shallower (late move reductions)
+    late_move = 3
+
+    # how many entries the transposition table may hold
+    table_size = 1 << 20
+
+    def __init__(self, game, depthlimit=None):
         """ Remember the game object.
             :param: game: an object from the Game Class, with methods as described
                     at the top of this document.
+            :param: depthlimit: how deep this searcher searches; None to use the
+                    game's depth_limit.  The game's own value is restored after
+                    every search, so searchers with different limits can share a game.
         """
         self.game = game
+        self.depth_limit = depthlimit
         self.nodes_expanded = 0
-        self.transposition_table = None
+
+        # kept from one decision to the next; each entry remembers the
+        # generation (the count of decisions so far) that stored it
+        self.transposition_table = dict()
+        self.generation = 0
+
+        # move ordering: a score per action for every cutoff it caused,
+        # and the last two actions that caused a cutoff at each depth
+        self.history = collections.defaultdict(int)
+        self.killers = collections.defaultdict(lambda: [None, None])
 
     def minimax_decision_max(self, state):
         """ Return the move that Max should take in the given state
             :param state: a legal game state
             :return: a SearchTerminationRecord
         """
+        return self.__decision(state, 1)
+
+    def minimax_decision_min(self, state):
+        """ Return the move that Min should take in the given state
+            :param state: a legal game state
+            :return: a SearchTerminationRecord
+        """
+        return self.__decision(state, -1)
+
+    def __decision(self, state, color):
+        """ Return the move that the player to move should take in the given state.
+            The search is iteratively deepened up to the depth limit;
+            each iteration searches the previous best move first, inside an
+            aspiration window around the previous value.
+            :param state: a legal game state
+            :param color: 1 if it's Max's turn, -1 if it's Min's turn
+            :return: a SearchTerminationRecord, with the value from Max's point of view
+        """
         start = time.perf_counter()
         self.nodes_expanded = 0
-        self.transposition_table = dict()
+        self.generation += 1
+        self.history.clear()
+        self.killers.clear()
 
-        # alpha beta parameters initialized here
-        alpha = -self.ifny
-        beta = self.ifny
+        # a depth limit of 0 or less can't be deepened; search it as it is
+        depth_limit = self.game.depth_limit
+        if self.depth_limit is not None:
+            target = self.depth_limit
+        else:
+            target = depth_limit
+        if target > 0:
+            limits = range(1, target+1)
+        else:
+            limits = [target]
 
-        # look for the best among Max's options
-        best = -self.ifny
+        best = None
         best_action = None
-
-        self.nodes_expanded += 1
-        for act in self.game.actions(state):
-            val = self.__min_value(
-                self.game.result(state, act), alpha, beta, 1)
-            if val > best:
-                # remember something better
-                best = val
-                best_action = act
-            alpha = max(alpha, best)
+        try:
+            for limit in limits:
+                self.game.depth_limit = limit
+                if best is None:
+                    alpha, beta = -self.ifny, self.ifny
+                else:
+                    alpha, beta = best - self.aspiration, best + self.aspiration
+                best, best_action = self.__root(state, alpha, beta, color, best_action)
+                if best <= alpha or best >= beta:
+                    # outside the aspiration window: search again with the full window
+                    best, best_action = self.__root(
+                        state, -self.ifny, self.ifny, color, best_action)
+        finally:
+            self.game.depth_limit = depth_limit
 
         end = time.perf_counter()
 
-        return SearchTerminationRecord(best, best_action, end - start, self.nodes_expanded)
+        return SearchTerminationRecord(color*best, best_action, end - start, self.nodes_expanded)
 
-    def minimax_decision_min(self, state):
-        """ Return the move that Min should take in the given state
+    def __root(self, state, alpha, beta, color, first):
+        """ Search the root of the tree once, to the current depth limit.
             :param state: a legal game state
-            :return: a SearchTerminationRecord
+            :param alpha: the best the player to move can do elsewhere
+            :param beta: the best the opponent can do elsewhere
+            :param color: 1 if it's Max's turn, -1 if it's Min's turn
+            :param first: an action to search first, e.g., the previous best
+            :return: a pair (value, action), the value from the point of view
+                     of the player to move
         """
-        start = time.perf_counter()
-        self.nodes_expanded = 0
-        self.transposition_table = dict()
-
-        # alpha beta parameters initialized here
-        alpha = -self.ifny
-        beta = self.ifny
-
-        # look for the best among Min's options
-        best = self.ifny
+        # look for the best among the player's options
+        best = -self.ifny
         best_action = None
 
         self.nodes_expanded += 1
-        for act in self.game.actions(state):
-            val = self.__max_value(
-                self.game.result(state, act), alpha, beta, 1)
-            if val < best:
+        actions = sorted(self.game.actions(state), key=lambda a: a != first)
+        for i, act in enumerate(actions):
+            undo = self.game.make(state, act)
+            val = self.__search_child(state, alpha, beta, 1, color, i == 0)
+            self.game.unmake(state, undo)
+            if val > best:
                 # remember something better
                 best = val
                 best_action = act
-            beta = min(beta, best)
-
-        end = time.perf_counter()
+            if best >= beta:
+                break
+            alpha = max(alpha, best)
 
-        return SearchTerminationRecord(best, best_action, end - start, self.nodes_expanded)
+        return best, best_action
 
-    def __max_value(self, state, alpha, beta, depth):
-        """ Return the minimax value of the given state, assuming Max's turn to move.
+    def __negamax(self, state, alpha, beta, depth, color, null_ok=True):
+        """ Return the minimax value of the given state, from the point of view
+            of the player to move.
             :param state: a legal game state
-            :param alpha: the best max can do elsewhere
-            :param beta: the best Min can do elsewhere
+            :param alpha: the best the player to move can do elsewhere
+            :param beta: the best the opponent can do elsewhere
             :param depth: an integer representing the depth of the state
-            :return: the value that Max can obtain here
+            :param color: 1 if it's Max's turn, -1 if it's Min's turn
+            :param null_ok: False right after a null move, so as not to pass twice
+            :return: the value that the player to move can obtain here
         """
-        state_string = self.game.transposition_string(state)
-        if state_string in self.transposition_table:
-            best = self.transposition_table[state_string]
-        elif self.game.is_terminal(state):
+        if self.game.is_terminal(state):
             # the game is over, return the utility
-            best = self.game.utility(state)
-        elif self.game.cutoff_test(state, depth):
-            best = self.game.eval(state)
+            # (checked first: the key need not tell a finished game apart)
+            return self.game.side_to_move_utility(state)
+
+        # how many more levels the search goes below this state
+        draft = self.game.draft(state, depth)
+
+        state_string = self.game.transposition_string(state)
+        entry = self.transposition_table.get(state_string)
+        if entry is not None and entry[2] >= draft:
+            # searched at least as deep as needed here before: use what we learned
+            value, flag = entry[0], entry[1]
+            if flag == EXACT:
+                return value
+            elif flag == LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+        alpha_orig = alpha
+
+        if self.game.cutoff_test(state, depth):
+            best = self.__quiesce(state, alpha, beta, color, 0)
+        elif null_ok and draft > self.null_move_reduction and self.game.null_move_allowed(state) \
+                and self.__null_move_fails_high(state, beta, depth, color):
+            # even passing is good enough
+            return beta
         else:
-            # look for the best among Max's options
+            # look for the best among the player's options
             best = -self.ifny
+            best_action = None
             self.nodes_expanded += 1
-            for act in self.game.actions(state):
-                val = self.__min_value(self.game.result(
-                    state, act), alpha, beta, depth+1)
+            if entry is not None and entry[4] is not None:
+                # the entry might have been stored from another board with the same key
+                hash_action = self.game.oriented_action(state, entry[4])
+            else:
+                hash_action = None
+            # (a search that is never cut off can't be made any shallower)
+            reducible = draft > 2 and self.game.draft(state, depth+2) < draft - 1
+            for i, act in enumerate(self._ordered(state, depth, hash_action)):
+                reduce = i >= self.late_move and reducible and not self.game.is_capture(state, act)
+                undo = self.game.make(state, act)
+                if reduce:
+                    # a late move is probably bad: check that at less depth,
+                    # and only search it fully if it turns out not to be
+                    val = -self.__negamax(state, -alpha-1, -alpha, depth+2, -color)
+                    if val > alpha:
+                        val = self.__search_child(state, alpha, beta, depth+1, color, False)
+                else:
+                    val = self.__search_child(state, alpha, beta, depth+1, color, i == 0)
+                self.game.unmake(state, undo)
                 if val > best:
                     # remember something better
                     best = val
+                    best_action = act
                 if best >= beta:
+                    self.__remember_cutoff(act, depth)
+                    # the remaining moves might be even better
+                    self.__store(state_string, best, LOWER, draft,
+                                 self.game.canonical_action(state, act))
                     return best
                 alpha = max(alpha, best)
-            self.transposition_table[state_string] = best
+            if best <= alpha_orig:
+                # every move failed low; the true value might be even worse
+                flag = UPPER
+            else:
+                flag = EXACT
+            if best_action is not None:
+                best_action = self.game.canonical_action(state, best_action)
+            self.__store(state_string, best, flag, draft, best_action)
         return best
 
-    def __min_value(self, state, alpha, beta, depth):
-        """ Return the minimax value of the given state, assuming Min's turn to move.
+    def __store(self, key, value, flag, draft, action):
+        """ Remember what the search learned about a state.
+            :param key: the state's transposition_string
+            :param value: the value found, from the point of view of the player to move
+            :param flag: EXACT, LOWER or UPPER, for what the value is
+            :param draft: how many levels the search went below the state
+            :param action: the best action found, or the one that caused a cutoff,
+                           as from game.canonical_action()
+        """
+        table = self.transposition_table
+        if len(table) >= self.table_size and key not in table:
+            self.__age_table()
+        table[key] = (value, flag, draft, self.generation, action)
+
+    def __age_table(self):
+        """ Make room in a full transposition table, by forgetting the entries
+            stored before the last two decisions; or, if those are too few,
+            also the shallowest half of the entries.
+        """
+        table = self.transposition_table
+        old = self.generation - 2
+        stale = [key for key, entry in table.items() if entry[3] < old]
+        if len(stale) < len(table) // 4:
+            drafts = sorted(entry[2] for entry in table.values())
+            shallow = drafts[len(drafts) // 2]
+            stale = [key for key, entry in table.items()
+                     if entry[3] < old or entry[2] <= shallow]
+        for key in stale:
+            del table[key]
+
+    def __null_move_fails_high(self, state, beta, depth, color):
+        """ Let the opponent move twice in a row, and search what follows at a
+            reduced depth, with a null window at beta.
             :param state: a legal game state
-            :param alpha: the best max can do elsewhere
-            :param beta: the best Min can do elsewhere
+            :param beta: the best the opponent can do elsewhere
             :param depth: an integer representing the depth of the state
-            :return: the value that Min can obtain here
+            :param color: 1 if it's Max's turn, -1 if it's Min's turn
+            :return: True if the player to move would still get at least beta
         """
-        state_string = self.game.transposition_string(state)
-        if state_string in self.transposition_table:
-            best = self.transposition_table[state_string]
-        elif self.game.is_terminal(state):
+        undo = self.game.make_null(state)
+        val = -self.__negamax(state, -beta, -beta+1, depth+1+self.null_move_reduction,
+                              -color, False)
+        self.game.unmake_null(state, undo)
+        return val >= beta
+
+    def __quiesce(self, state, alpha, beta, color, qdepth):
+        """ Return an estimate of the value of the given state, from the point of
+            view of the player to move, once the captures have played out.
+            The player to move can stand pat on eval(), or try one of the captures.
+            :param state: a legal game state, at or below the depth limit
+            :param alpha: the best the player to move can do elsewhere
+            :param beta: the best the opponent can do elsewhere
+            :param color: 1 if it's Max's turn, -1 if it's Min's turn
+            :param qdepth: how many captures have been made below the depth limit
+            :return: the value that the player to move can obtain here
+        """
+        if self.game.is_terminal(state):
             # the game is over, return the utility
-            best = self.game.utility(state)
-        elif self.game.cutoff_test(state, depth):
-            best = self.game.eval(state)
-        else:
-            # look for the best among Max's options
-            best = self.ifny
+            return self.game.side_to_move_utility(state)
+
+        best = color * self.game.eval(state)
+        if best >= beta or qdepth >= self.quiescence_limit:
+            return best
+        alpha = max(alpha, best)
+
+        captures = self.game.capture_actions(state)
+        if captures:
             self.nodes_expanded += 1
-            for act in self.game.actions(state):
-                val = self.__max_value(self.game.result(
-                    state, act), alpha, beta, depth+1)
-                if val < best:
-                    # remember something better
-                    best = val
-                if best <= alpha:
-                    return best
-                beta = min(beta, best)
-            self.transposition_table[state_string] = best
+        for act in captures:
+            undo = self.game.make(state, act)
+            val = -self.__quiesce(state, -beta, -alpha, -color, qdepth+1)
+            self.game.unmake(state, undo)
+            if val > best:
+                # remember something better
+                best = val
+            if best >= beta:
+                return best
+            alpha = max(alpha, best)
         return best
+
+    def __search_child(self, child, alpha, beta, depth, color, first):
+        """ Principal Variation Search of one child of a state.
+            The first child is searched with the full window; the others only
+            have to be shown to be no better than alpha, using a null window,
+            and are searched again with the full window if that fails.
+            :param child: the state resulting from an action (made, not copied)
+            :param alpha: the best the player to move can do elsewhere
+            :param beta: the best the opponent can do elsewhere
+            :param depth: an integer representing the depth of the child
+            :param color: 1 if it's Max's turn in the parent, -1 otherwise
+            :param first: True if this is the first child searched
+            :return: the value of the child, from the point of view of the parent
+        """
+        if first:
+            return -self.__negamax(child, -beta, -alpha, depth, -color)
+        val = -self.__negamax(child, -alpha-1, -alpha, depth, -color)
+        if alpha < val < beta:
+            # better than expected: find out the real value
+            val = -self.__negamax(child, -beta, -alpha, depth, -color)
+        return val
+
+    def _ordered(self, state, depth, first=None):
+        """ Return the actions in the given state, the most promising first:
+            the given action, the killer moves for this depth, then by history
+            score.  Ties keep the order the game gave them in.
+            :param state: a legal game state
+            :param depth: an integer representing the depth of the state
+            :param first: an action to search first, e.g., the best one stored
+                          in the transposition table
+            :return: a list of actions legal in the given state
+        """
+        killers = self.killers[depth]
+        return sorted(self.game.actions(state),
+                      key=lambda a: (a != first, a not in killers, -self.history[a]))
+
+    def __remember_cutoff(self, act, depth):
+        """ Update the move ordering tables after act caused a cutoff.
+            :param act: the action that caused the cutoff
+            :param depth: an integer representing the depth of the state
+        """
+        self.history[act] += 1 << depth
+        killers = self.killers[depth]
+        if act != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = act
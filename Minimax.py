@@ -1,5 +1,8 @@
 import time as time
 
+# marks the end of the actions in a stack frame (None is a possible action)
+_DONE = object()
+
 ##########################################################################################
 
 
@@ -41,17 +44,24 @@ class Minimax(object):
     """ An implementation of MiniMax Search
         - no pruning
         - no transposition table
+        - actions are made and unmade on a single state, not copied
+        - an explicit stack instead of recursion
+        - as a negamax: one code path for both players
     """
 
     # a clumsy way to represent a large value
     ifny = 2**20
 
-    def __init__(self, game):
+    def __init__(self, game, depthlimit=None):
         """ Remember the game object.
             :param: game: an object from the Game Class, with methods as described
                     at the top of this document.
+            :param: depthlimit: how deep this searcher searches; None to use the
+                    game's depth_limit.  The game's own value is restored after
+                    every search, so searchers with different limits can share a game.
         """
         self.game = game
+        self.depth_limit = depthlimit
         self.nodes_expanded = 0
 
     def minimax_decision_max(self, state):
@@ -59,87 +69,86 @@ class Minimax(object):
             :param state: a legal game state
             :return: a SearchTerminationRecord
         """
-        start = time.perf_counter()
-        self.nodes_expanded = 0
-
-        # look for the best among Max's options
-        best = -self.ifny
-        best_action = None
-
-        self.nodes_expanded += 1
-        for act in self.game.actions(state):
-            val = self.__min_value(self.game.result(state, act), 1)
-            if val > best:
-                # remember something better
-                best = val
-                best_action = act
-
-        end = time.perf_counter()
-
-        return SearchTerminationRecord(best, best_action, end - start, self.nodes_expanded)
+        return self.__decision(state, 1)
 
     def minimax_decision_min(self, state):
         """ Return the move that Min should take in the given state
             :param state: a legal game state
             :return: a SearchTerminationRecord
         """
+        return self.__decision(state, -1)
+
+    def __decision(self, state, color):
+        """ Return the move that the player to move should take in the given state
+            :param state: a legal game state
+            :param color: 1 if it's Max's turn, -1 if it's Min's turn
+            :return: a SearchTerminationRecord, with the value from Max's point of view
+        """
         start = time.perf_counter()
         self.nodes_expanded = 0
 
-        # look for the best among Min's options
-        best = self.ifny
-        best_action = None
-
-        self.nodes_expanded += 1
-        for act in self.game.actions(state):
-            val = self.__max_value(self.game.result(state, act), 1)
-            if val < best:
-                # remember something better
-                best = val
-                best_action = act
+        depth_limit = self.game.depth_limit
+        if self.depth_limit is not None:
+            self.game.depth_limit = self.depth_limit
+        try:
+            best, best_action = self.search_iter(state, color)
+        finally:
+            self.game.depth_limit = depth_limit
 
         end = time.perf_counter()
 
-        return SearchTerminationRecord(best, best_action, end - start, self.nodes_expanded)
-
-    def __max_value(self, state, depth):
-        """ Return the minimax value of the given state.
-            :param state: a legal game state
-            :return: the value that Max can obtain here
+        return SearchTerminationRecord(color*best, best_action, end - start, self.nodes_expanded)
+
+    def search_iter(self, state, color):
+        """ Return the minimax value of the given state, and a move to obtain it.
+            The search is a negamax: every value is from the point of view of the
+            player to move, and changes sign from one level to the next.
+            Instead of recursing, the search keeps its own stack, with one frame
+            for every state on the path from the root to the current state:
+                [depth, color, actions, best, best_action, pending]
+            where actions iterates over the actions still to be searched, and
+            pending is (action, undo record) for the action being searched below.
+            :param state: a legal game state; searched in place, and restored
+            :param color: 1 to search for Max, -1 to search for Min
+            :return: a pair (value, action), the value from the point of view of
+                     the player given by color
         """
-        if self.game.is_terminal(state):
-            # the game is over, return the utility
-            best = self.game.utility(state)
-        elif self.game.cutoff_test(state, depth):
-            best = self.game.eval(state)
-        else:
-            # look for the best among Max's options
-            best = -self.ifny
-            self.nodes_expanded += 1
-            for act in self.game.actions(state):
-                val = self.__min_value(self.game.result(state, act), depth+1)
-                if val > best:
-                    # remember something better
-                    best = val
-        return best
-
-    def __min_value(self, state, depth):
-        """ Return the minimax value of the given state.
-            :param state: a legal game state
-            :return: the value that Min can obtain here
-        """
-        if self.game.is_terminal(state):
-            # the game is over, return the utility
-            best = self.game.utility(state)
-        elif self.game.cutoff_test(state, depth):
-            best = self.game.eval(state)
-        else:
-            # look for the best among Max's options
-            best = self.ifny
-            self.nodes_expanded += 1
-            for act in self.game.actions(state):
-                val = self.__max_value(self.game.result(state, act), depth+1)
-                if val < best:
-                    # remember something better
-                    best = val
-        return best
+        game = self.game
+
+        self.nodes_expanded += 1
+        stack = [[0, color, iter(game.actions(state)), -self.ifny, None, None]]
+        while True:
+            frame = stack[-1]
+            act = next(frame[2], _DONE)
+            if act is _DONE:
+                # every action has been searched: the value of this frame is known
+                stack.pop()
+                if not stack:
+                    return frame[3], frame[4]
+                val = -frame[3]
+                # back to the parent, and the action that led here
+                frame = stack[-1]
+                act, undo = frame[5]
+                game.unmake(state, undo)
+            else:
+                undo = game.make(state, act)
+                depth = frame[0] + 1
+                if game.is_terminal(state):
+                    # the game is over, use the utility
+                    # (this frame's player just moved, so negate it)
+                    val = -game.side_to_move_utility(state)
+                elif game.cutoff_test(state, depth):
+                    val = frame[1] * game.eval(state)
+                else:
+                    # search below this action before coming back to this frame
+                    frame[5] = (act, undo)
+                    self.nodes_expanded += 1
+                    stack.append([depth, -frame[1], iter(game.actions(state)),
+                                  -self.ifny, None, None])
+                    continue
+                game.unmake(state, undo)
+
+            if val > frame[3]:
+                # remember something better
+                frame[3] = val
+                frame[4] = act
@@ -28,18 +28,60 @@
 #       - only terminal states have utility; other states get
 #         their value from searching.
 #
+#    side_to_move_utility(self, state)
+#       - the utility of the given terminal state, from the point of view
+#         of the player to move: k_max - k_draw if they won, k_min - k_draw if
+#         they lost, 0 for a draw
+#       - lets a negamax search use terminal values without flipping signs
+#
 #    actions(self, state)
 #       - returns a list of actions legal in the given state
 #
+#    is_legal(self, state, action)
+#       - returns a boolean that indicates if the action is legal in the given state
+#
+#    capture_actions(self, state)
+#       - returns the actions in the given state that capture a piece
+#       - used by a quiescence search, to look past the depth limit
+#         while the material is still changing hands
+#
+#    is_capture(self, state, action)
+#       - returns a boolean that indicates if the given legal action
+#         captures a piece
+#
 #    result(self, state, action)
 #       - returns the state resulting from the action in the given state
 #
+#    make(self, state, action)
+#       - applies the action to the given state, changing it in place
+#       - returns an undo record
+#
+#    unmake(self, state, undo)
+#       - takes back the action, given the undo record returned by make()
+#       - make() and unmake() let a search avoid copying states
+#
+#    null_move_allowed(self, state)
+#       - returns a boolean that indicates if a search may try passing the
+#         turn to the opponent (a null move) to prune the given state
+#       - should be False whenever passing could actually be good for the
+#         player to move, or when the game cannot represent a pass
+#
+#    make_null(self, state), unmake_null(self, state, undo)
+#       - like make() and unmake(), for a null move: only the turn changes
+#       - only called if null_move_allowed() returned True
+#
 #    cutoff_test(self, state, depth)
 #       - returns a bolean that indicates if this state and depth is suitable
 #         to limit depth of search.  A simple implementation might just look
 #         at the depth; a more sophisticated implementation might look at
 #         the state as well as the depth.
 #
+#    draft(self, state, depth)
+#       - returns how many more levels a search goes below the given state
+#         and depth before cutoff_test() stops it; a large enough value if
+#         it never will.  A transposition table uses it to tell how deep
+#         a stored value was searched.
+#
 #    eval(self, state)
 #       - returns a numeric value that estimates the minimax value of the
 #         given state.  This gets called if cutoff_test() returns true.
@@ -54,31 +96,53 @@
 #         fact known from utility().
 #
 #    transposition_string(self)
-#       - return a string representation of the state
+#       - return a string representation of the state, or any other
+#         hashable key, e.g., a Zobrist hash
 #       - for use in a transposition table
 #       - this string should represent the state exactly, but also without
 #         too much waste.  In a normal game, lots of these get stored!
 #
+#    canonical_action(self, state, action), oriented_action(self, state, action)
+#       - convert an action to the form to store under the state's key, and back
+#       - the identity, unless the key stands for several boards, e.g., the
+#         rotations of a board
+#
 #    congratulate(self)
 #       - could be called at the end of the game to indicate who wins
 #       - this is not absolutely necessary, but could be informative
 
+
+import functools
+import random
+
+import movegen
+
+# the kinds of pieces, as used to index the Zobrist keys
+SITH, REBEL, JEDI = 0, 1, 2
+
 class GameState(object):
     """ The GameState class stores the information about the state of the game.
+        The pieces are stored as bitboards: bit r*dim+c of an integer is set
+        if a piece of that kind is on square (r,c).
     """
 
     def __init__(self, dim=5):
         # makes bigger boards a little less trouble to use
         self.dim = dim
 
-        # a list for all the sith pieces
-        self.sith = []
+        # a bitboard for all the sith pieces
+        self.sith_bb = 0
+
+        # a bitboard for all the rebel pieces
+        self.rebels_bb = 0
 
-        # a list for all the rebel pieces
-        self.rebels = []
+        # a bitboard for the jedi
+        self.jedi_bb = 0
 
-        # a list of the jedi
-        self.jedi = []
+        # how many of each there are, kept up to date as pieces come and go
+        self.n_sith = 0
+        self.n_rebels = 0
+        self.n_jedi = 0
 
         # a boolean to store if it's Max's turn; True by default
         self.maxs_turn = True
@@ -93,27 +157,32 @@ class GameState(object):
         #       cachedOutcome == None means a draw
         self.cachedOutcome = None
 
-        # now cache the string that represents this state
-        self.stringified = str(self)
-
         self.moves_made = 0
 
+        # the Zobrist hash of the position, kept up to date by Game.make()
+        self.zobrist = 0
+
+        # the legal actions, once Game.actions() has been asked for them
+        self._actions = None
+
     def myclone(self):
         """ Make and return an exact copy of the state.
         """
-        new_state = GameState()
-
-        # make copies, not references
-        new_state.sith = [s for s in self.sith]
-        new_state.rebels = [r for r in self.rebels]
-        new_state.jedi = [j for j in self.jedi]
-
-        # the rest are immutable anyway
+        new_state = GameState(self.dim)
+
+        # bitboards are ints, so they are immutable, like the rest
+        new_state.sith_bb = self.sith_bb
+        new_state.rebels_bb = self.rebels_bb
+        new_state.jedi_bb = self.jedi_bb
+        new_state.n_sith = self.n_sith
+        new_state.n_rebels = self.n_rebels
+        new_state.n_jedi = self.n_jedi
         new_state.maxs_turn = self.maxs_turn
         new_state.cachedTerminal = self.cachedTerminal
         new_state.cachedOutcome = self.cachedOutcome
-        new_state.stringified = self.stringified
         new_state.moves_made = self.moves_made
+        new_state.zobrist = self.zobrist
+        # the copy is about to be changed, so don't bother copying _actions
 
         return new_state
 
@@ -124,14 +193,7 @@ class GameState(object):
         for r in range(self.dim):
             rr = self.dim - r - 1
             for c in range(self.dim):
-                if (rr, c) in self.sith:
-                    print('S', end='')
-                elif (rr, c) in self.rebels:
-                    print('R', end='')
-                elif (rr, c) in self.jedi:
-                    print('J', end='')
-                else:
-                    print('.', end='')
+                print(self._piece_at(rr, c, '.'), end='')
             print()
 
     def __str__(self):
@@ -142,22 +204,24 @@ class GameState(object):
         s = ""
         for r in range(self.dim):
             for c in range(self.dim):
-                if (r, c) in self.sith:
-                    s += 'S'
-                elif (r, c) in self.rebels:
-                    s += 'R'
-                elif (r, c) in self.jedi:
-                    s += 'J'
-                else:
-                    s += ' '
+                s += self._piece_at(r, c, ' ')
         return s
 
-    def _occupied(self, r, c):
-        """ Determine if the given location is occupied by one of the pieces.
+    def _piece_at(self, r, c, blank):
+        """ Describe the piece on the given location with a single character.
             :param: r,c: integers
-            :return: True if (r,c) is one of the pieces still on the board
+            :param: blank: the character to use for an empty square
+            :return: 'S', 'R', 'J' or blank
         """
-        return (r, c) in self.rebels or (r, c) in self.jedi or (r, c) in self.sith
+        bit = 1 << (r*self.dim + c)
+        if self.sith_bb & bit:
+            return 'S'
+        elif self.rebels_bb & bit:
+            return 'R'
+        elif self.jedi_bb & bit:
+            return 'J'
+        else:
+            return blank
 
 
 class Game(object):
@@ -172,15 +236,36 @@ class Game(object):
         self.depth_limit = depthlimit
         self.move_limit = movelimit
 
+        # move generation tables for the configured board size (shared, not copied)
+        self.king_attacks, self.rays, self.steps = movegen.build_tables(dim)
+        self.board_mask = (1 << dim*dim) - 1
+
+        # Zobrist keys: a random number for each kind of piece on each square,
+        # and one for Min to move.  The fixed seed gives every Game of this size
+        # the same keys, so a state hashes the same whichever Game made it.
+        rng = random.Random(dim)
+        self.zobrist_keys = [[rng.getrandbits(64) for _ in range(dim*dim)]
+                             for _ in (SITH, REBEL, JEDI)]
+        self.zobrist_side = rng.getrandbits(64)
+        # and one for each count of moves made, since the game ends at the move
+        # limit: the same board with fewer moves left can have a different value
+        self.zobrist_moves = [rng.getrandbits(64) for _ in range(movelimit + 2)]
+
+        # positions are often reached again, by transposition, or when the
+        # search comes back to them in the next iteration
+        self._actions_cache = functools.lru_cache(maxsize=1 << 18)(self._generate_actions)
+
     def initial_state(self):
         """ Return an initial state for the game.
         """
         # the default GameState constructor creates the initial starting position
         state = GameState(dim=self.dim)
-        state.sith.append((self.dim-1, self.dim//2))
+        state.sith_bb = 1 << ((self.dim-1)*self.dim + self.dim//2)
         for c in range(0, self.dim, 1):
-            state.rebels.append((0, c))
-        state.stringified = str(state)
+            state.rebels_bb |= 1 << c
+        state.n_sith = 1
+        state.n_rebels = self.dim
+        state.zobrist = self._zobrist_hash(state)
 
         return state
 
@@ -205,18 +290,50 @@ class Game(object):
 
     def actions(self, state):
         """ Returns all the legal actions in the given state.
+            An action is an integer from_sq << 8 | to_sq, where square (r,c)
+            is numbered r*dim+c; see _pack() and _unpack().
+            The actions are remembered on the state, and for positions seen recently.
+            :param state: a state object
+            :return: a tuple of actions legal in the given state; don't change it
+        """
+        if state._actions is None:
+            state._actions = self._actions_cache(
+                state.sith_bb, state.rebels_bb, state.jedi_bb, state.maxs_turn)
+        return state._actions
+
+    def is_legal(self, state, action):
+        """ Indicate if the given action is legal in the given state.
             :param state: a state object
-            :return: a list of actions legal in the given state
+            :param action: anything, but True only for an action from actions()
+            :return: True if the action is legal
+        """
+        return action in self.actions(state)
+
+    def capture_actions(self, state):
+        """ Returns the legal actions in the given state that capture a piece:
+            a Jedi taking a Sith, or a Sith taking a Rebel or converting a Jedi.
+            :param state: a state object
+            :return: a list of capturing actions legal in the given state
         """
         if state.maxs_turn:
-            # broken into 2 private methods
-            some = self.__rebel_actions(state) + self.__jedi_actions(state)
-            if len(some) == 0:
-                return [None]
-            else:
-                return some
+            enemies = state.sith_bb
+        else:
+            enemies = state.rebels_bb | state.jedi_bb
+        return [a for a in self.actions(state) if a is not None and (enemies >> (a & 0xFF)) & 1]
+
+    def is_capture(self, state, action):
+        """ Indicate if the given action captures a piece.
+            :param state: a state object
+            :param action: an action legal in the given state
+            :return: True if a piece of the other player is on the target square
+        """
+        if action is None:
+            return False
+        if state.maxs_turn:
+            enemies = state.sith_bb
         else:
-            return self.__sith_actions(state)
+            enemies = state.rebels_bb | state.jedi_bb
+        return bool((enemies >> (action & 0xFF)) & 1)
 
     def result(self, state, action):
         """ Return the state that results from the application of the
@@ -228,30 +345,93 @@ class Game(object):
 
         # first make a copy of the state
         new_state = state.myclone()
-        new_state.moves_made += 1
+        self.make(new_state, action)
 
-        if action is None:
-            new_state.cachedTerminal = True
-            new_state.cachedOutcome = None
-            return new_state
+        return new_state
+
+    def make(self, state, action):
+        """ Apply the given action to the given state, changing it in place.
+            Cheaper than result(), because nothing is copied.
+            :param state: a legal game state, to be mutated
+            :param action: a legal action in the game state
+            :return: an undo record, to give back to unmake()
+        """
+        # everything that can change, except moves_made, which just counts up
+        undo = (state.sith_bb, state.rebels_bb, state.jedi_bb,
+                state.n_sith, state.n_rebels, state.n_jedi, state.maxs_turn,
+                state.cachedTerminal, state.cachedOutcome, state.zobrist, state._actions)
+        state.moves_made += 1
+        state._actions = None
 
-        # my actions are 4-tuples, with the old and new positions
-        oldr, oldc, newr, newc = action
+        if action is None:
+            state.cachedTerminal = True
+            state.cachedOutcome = None
+            return undo
 
         if state.maxs_turn:
-            self.__player1_result(state, new_state, action)
+            self.__player1_result(state, action)
         else:
-            self.__player2_result(state, new_state, action)
+            self.__player2_result(state, action)
 
-        new_state.maxs_turn = not state.maxs_turn
+        state.maxs_turn = not state.maxs_turn
+        state.zobrist ^= self.zobrist_side
 
        # check if the move was a winning move here
-        self._cache_outcome(new_state)
+        self._cache_outcome(state)
 
-        # now, finally, create the stringification
-        new_state.stringified = str(new_state)
+        return undo
 
-        return new_state
+    def unmake(self, state, undo):
+        """ Take back the action that make() applied to the given state.
+            :param state: the game state given to make()
+            :param undo: the record returned by make()
+        """
+        (state.sith_bb, state.rebels_bb, state.jedi_bb,
+         state.n_sith, state.n_rebels, state.n_jedi, state.maxs_turn,
+         state.cachedTerminal, state.cachedOutcome, state.zobrist, state._actions) = undo
+        state.moves_made -= 1
+
+    def null_move_allowed(self, state):
+        """ Indicate if a search may try a null move in the given state.
+            Not when the player to move has fewer than 2 pieces, as passing
+            might then really be the best thing to do; and not when a Sith
+            is next to a Jedi, since one of them is about to be taken.
+            :param state: a legal game state
+            :return: True if a null move may be tried
+        """
+        if state.maxs_turn:
+            own = state.n_rebels + state.n_jedi
+        else:
+            own = state.n_sith
+        if own < 2:
+            return False
+
+        sith_bb = state.sith_bb
+        while sith_bb:
+            sq = (sith_bb & -sith_bb).bit_length() - 1
+            sith_bb &= sith_bb - 1
+            if self.king_attacks[sq] & state.jedi_bb:
+                return False
+        return True
+
+    def make_null(self, state):
+        """ Pass the turn to the other player, changing the state in place.
+            :param state: a legal game state, to be mutated
+            :return: an undo record, to give back to unmake_null()
+        """
+        undo = (state.zobrist, state._actions)
+        state.maxs_turn = not state.maxs_turn
+        state.zobrist ^= self.zobrist_side
+        state._actions = None
+        return undo
+
+    def unmake_null(self, state, undo):
+        """ Take back the null move that make_null() applied to the given state.
+            :param state: the game state given to make_null()
+            :param undo: the record returned by make_null()
+        """
+        state.maxs_turn = not state.maxs_turn
+        state.zobrist, state._actions = undo
 
     def utility(self, state):
         """ Calculate the utility of the given state.
@@ -267,6 +447,18 @@ class Game(object):
         else:
             return 0
 
+    def side_to_move_utility(self, state):
+        """ Calculate the utility of the given state for the player to move.
+            :param state: a legal game state
+            :return: utility of the terminal state; 100 if the player to move won
+        """
+        if state.cachedOutcome is None:
+            return 0
+        elif state.cachedOutcome == state.maxs_turn:
+            return 100
+        else:
+            return -100
+
     def cutoff_test(self, state, depth):
         """
             Check if the search should be cut-off early.
@@ -281,6 +473,14 @@ class Game(object):
         """
         return depth > self.depth_limit
 
+    def draft(self, state, depth):
+        """ Count how many more levels the search goes below this state.
+            :param state: a game state
+            :param depth: the depth of the state, as given to cutoff_test()
+            :return: an integer; less than 1 if the search stops here
+        """
+        return self.depth_limit - depth
+
     def eval(self, state):
         """
             When a depth limit is applied, we need to evaluate the
@@ -288,7 +488,7 @@ class Game(object):
             state: a legal game state
             :return: a numeric value in the range of the utility function
         """
-        return 2*len(state.rebels) + 10*len(state.jedi) - 5*len(state.sith)
+        return 2*state.n_rebels + 10*state.n_jedi - 5*state.n_sith
 
     def congratulate(self, state):
         """ Called at the end of a game, display some appropriate 
@@ -308,142 +508,170 @@ class Game(object):
 
         return  # not really needed, but indicates the end of the method
 
+    def action_to_string(self, action):
+        """ To make actions look nice when sent to the console.
+            :param: action: an action as created by actions()
+            :return: a string
+        """
+        if action is None:
+            return "no move"
+        oldr, oldc, newr, newc = self._unpack(action)
+        return "row {}, col {} to row {}, col {}".format(oldr, oldc, newr, newc)
+
     def transposition_string(self, state):
-        """ Returns a unique string for the given state.  For use in 
+        """ Returns a (practically) unique key for the given state.  For use in 
             any Game Tree Search that employs a transposition table.
             :param state: a legal game state
-            :return: a unique string representing the state
+            :return: the Zobrist hash of the state and the moves made, an integer
         """
-        return state.stringified
+        return state.zobrist ^ self.zobrist_moves[state.moves_made]
 
-    # all remaining methods are to assist in the calculations
-
-    def _inbounds(self, r, c):
-        """ Determine if the given location is a legal position on the board.
-            :param: r,c: integers
-            :return: True if (r,c) is on the board
+    def canonical_action(self, state, action):
+        """ Convert an action to the form to store under the state's key.
+            :param state: a legal game state
+            :param action: an action legal in the given state
+            :return: the same action; every key stands for a single board
         """
-        return 0 <= r < self.dim and 0 <= c < self.dim
+        return action
 
-    def __sith_actions(self, state):
-        """ Returns a list of moves for the Sith pieces.
-            The Sith moves like a King in Chess
+    def oriented_action(self, state, action):
+        """ Convert an action stored under the state's key back for the given state.
             :param state: a legal game state
-            :return: a list of sith actions in the given state
+            :param action: an action from canonical_action()
+            :return: the same action; every key stands for a single board
         """
-        all_moves = []
-        for sr, sc in state.sith:
-            # eight possible movements
-            for (i, j) in [(1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1)]:
-                # check if in bounds
-                if self._inbounds(sr+i, sc+j) and (sr+i, sc+j) not in state.sith:
-                    all_moves.append((sr, sc, sr+i, sc+j))
+        return action
+
+    # all remaining methods are to assist in the calculations
 
-        return all_moves
+    def _pack(self, oldr, oldc, newr, newc):
+        """ Pack a move from (oldr,oldc) to (newr,newc) into an action.
+            :param: oldr, oldc, newr, newc: integers
+            :return: an action, an integer
+        """
+        return (oldr*self.dim + oldc) << 8 | (newr*self.dim + newc)
 
-    def __rebel_actions(self, state):
-        """ Returns a list of moves for the Rebel pieces.
-            The Rebel moves like a Pawn in Chess.
-            In this version, Rebels cannot capture!
+    def _unpack(self, action):
+        """ Unpack an action into the squares it moves from and to.
+            :param: action: an action as created by actions()
+            :return: a tuple (oldr, oldc, newr, newc)
+        """
+        return divmod(action >> 8, self.dim) + divmod(action & 0xFF, self.dim)
 
-            :param state: a legal game state
-            :return: a list of rebel actions in the given state
+    def _generate_actions(self, sith_bb, rebels_bb, jedi_bb, maxs_turn):
+        """ Generate the legal actions for the given position.
+            :param sith_bb, rebels_bb, jedi_bb: the bitboards of the pieces
+            :param maxs_turn: True if it's Max's turn
+            :return: a tuple of actions, as described in actions()
         """
-        all_moves = []
-        for rr, rc in state.rebels:
-            if self._inbounds(rr+1, rc) and not state._occupied(rr+1, rc):
-                all_moves.append((rr, rc, rr+1, rc))
+        occ = sith_bb | rebels_bb | jedi_bb
+        if maxs_turn:
+            moves = movegen.rebel_moves(rebels_bb, occ, self.dim, self.board_mask) \
+                + movegen.jedi_moves(jedi_bb, occ, sith_bb, self.rays, self.steps)
+            if len(moves) == 0:
+                return (None,)
+        else:
+            moves = movegen.sith_moves(sith_bb, self.king_attacks)
 
-        return all_moves
+        # movegen packs each move into one integer, just like _pack()
+        return tuple(moves)
 
-    def __jedi_actions(self, state):
-        """ Returns a list of moves for the Sith pieces.
-            The Sith moves like a Queen in Chess.
+    def _zobrist_hash(self, state):
+        """ Calculate the Zobrist hash of the given state from scratch.
+            Game.make() updates the hash incrementally instead.
             :param state: a legal game state
-            :return: a list of jedi actions in the given state
-        """
-        all_moves = []
-        for jr, jc in state.jedi:
-            # 8 directions
-            for (dr, dc) in [(1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1)]:
-                i = 1
-                # walk along the (dr,dc) direction until the edge or an occupied square
-                while self._inbounds(jr+i*dr, jc+i*dc) and not state._occupied(jr+i*dr, jc+i*dc):
-                    all_moves.append((jr, jc, jr+i*dr, jc+i*dc))
-                    i += 1
-                # but if the occupied square is Sith, add the capture move
-                if (jr+i*dr, jc+i*dc) in state.sith:
-                    all_moves.append((jr, jc, jr+i*dr, jc+i*dc))
-
-        return all_moves
-
-    def __player1_result(self, state, new_state, action):
-        """ process the results of the action in the newstate 
+            :return: an integer
+        """
+        h = 0 if state.maxs_turn else self.zobrist_side
+        for piece, bb in ((SITH, state.sith_bb), (REBEL, state.rebels_bb), (JEDI, state.jedi_bb)):
+            while bb:
+                sq = (bb & -bb).bit_length() - 1
+                bb &= bb - 1
+                h ^= self.zobrist_keys[piece][sq]
+        return h
+
+    def __player1_result(self, state, action):
+        """ process the results of the action in the state
             assuming the action is player 1 (the rebels and jedi)
-            This method mutates newstate.
+            This method mutates state.
 
-            :param state: a legal game state
-            :param new_state: a clone of state, to be mutated
+            :param state: a legal game state, to be mutated
             :param action: a legal action in the game state
-            Return: None (newstate is modified)
+            Return: None (state is modified)
         """
-        oldr, oldc, newr, newc = action
+        old_sq, new_sq = action >> 8, action & 0xFF
+        old_bit, new_bit = 1 << old_sq, 1 << new_sq
+
+        keys = self.zobrist_keys
 
         # Player 1 moved
-        if (newr, newc) in new_state.sith:
+        if state.sith_bb & new_bit:
             # and captured a Sith!
-            new_state.sith.remove((newr, newc))
+            state.sith_bb ^= new_bit
+            state.n_sith -= 1
+            state.zobrist ^= keys[SITH][new_sq]
 
-        if (oldr, oldc) in state.rebels:
+        if state.rebels_bb & old_bit:
             # it was a rebel that moved
-            new_state.rebels.remove((oldr, oldc))
-            if newr == self.dim - 1:
+            state.rebels_bb ^= old_bit
+            state.zobrist ^= keys[REBEL][old_sq]
+            if new_sq // self.dim == self.dim - 1:
                 # promotion to Jedi
-                new_state.jedi.append((newr, newc))
+                state.jedi_bb |= new_bit
+                state.n_rebels -= 1
+                state.n_jedi += 1
+                state.zobrist ^= keys[JEDI][new_sq]
             else:
-                new_state.rebels.append((newr, newc))
+                state.rebels_bb |= new_bit
+                state.zobrist ^= keys[REBEL][new_sq]
         else:
             # it was a jedi that moved
-            new_state.jedi.remove((oldr, oldc))
-            new_state.jedi.append((newr, newc))
+            state.jedi_bb ^= old_bit | new_bit
+            state.zobrist ^= keys[JEDI][old_sq] ^ keys[JEDI][new_sq]
 
-    def __player2_result(self, state, new_state, action):
-        """ process the results of the action in the newstate 
-            assuming the action is player 1 (the sith)
-            This method mutates newstate.
+    def __player2_result(self, state, action):
+        """ process the results of the action in the state
+            assuming the action is player 2 (the sith)
+            This method mutates state.
 
-            :param state: a legal game state
-            :param new_state: a clone of state, to be mutated
+            :param state: a legal game state, to be mutated
             :param action: a legal action in the game state
-            Return: None (newstate is modified)
+            Return: None (state is modified)
         """
-        oldr, oldc, newr, newc = action
+        old_sq, new_sq = action >> 8, action & 0xFF
+        old_bit, new_bit = 1 << old_sq, 1 << new_sq
+
+        keys = self.zobrist_keys
 
         # Player 2 moved
-        if (newr, newc) in state.rebels:
+        if state.rebels_bb & new_bit:
             # captured a Rebel
-            new_state.rebels.remove((newr, newc))
+            state.rebels_bb ^= new_bit
+            state.n_rebels -= 1
             # move the Sith
-            new_state.sith.remove((oldr, oldc))
-            new_state.sith.append((newr, newc))
-        elif (newr, newc) in state.jedi:
+            state.sith_bb ^= old_bit | new_bit
+            state.zobrist ^= keys[REBEL][new_sq] ^ keys[SITH][old_sq] ^ keys[SITH][new_sq]
+        elif state.jedi_bb & new_bit:
             # converted a Jedi
-            new_state.jedi.remove((newr, newc))
-            new_state.sith.append((newr, newc))
+            state.jedi_bb ^= new_bit
+            state.sith_bb |= new_bit
+            state.n_jedi -= 1
+            state.n_sith += 1
+            state.zobrist ^= keys[JEDI][new_sq] ^ keys[SITH][new_sq]
         else:
             # Sith movement only
-            new_state.sith.remove((oldr, oldc))
-            new_state.sith.append((newr, newc))
+            state.sith_bb ^= old_bit | new_bit
+            state.zobrist ^= keys[SITH][old_sq] ^ keys[SITH][new_sq]
 
     def _cache_outcome(self, state):
         """ Look at the board and check if the new move was a winner.
             :param state: a legal game state
             :return:
         """
-        if len(state.sith) == 0:
+        if state.n_sith == 0:
             state.cachedTerminal = True
             state.cachedOutcome = True  # Max
-        elif len(state.rebels) == 0 and len(state.jedi) == 0:
+        elif state.n_rebels + state.n_jedi == 0:
             state.cachedTerminal = True
             state.cachedOutcome = False  # Min
         else:
@@ -8,18 +8,44 @@
 #       - indicates if the game is over
 #    utility(self, state)
 #       - the utility value of the given state
+#    side_to_move_utility(self, state)
+#       - the utility value of the given state, for the player to move
 #    actions(self, state)
 #       - list actions legal in the given state
+#    is_legal(self, state, action)
+#       - indicate if the action is legal in the given state
+#    capture_actions(self, state)
+#       - list the legal actions that capture a piece (used by quiescence search)
+#    is_capture(self, state, action)
+#       - indicate if the given legal action captures a piece
 #    result(self, state, action)
 #       - give the rstate resulting from the action in the given state
+#    make(self, state, action)
+#       - apply the action to the given state in place, return an undo record
+#    unmake(self, state, undo)
+#       - take back the action applied by make(), given its undo record
+#    null_move_allowed(self, state)
+#       - indicate if a search may prune by passing the turn (a null move)
+#    make_null(self, state), unmake_null(self, state, undo)
+#       - like make()/unmake() for a null move; only needed if null moves are allowed
+#    canonical_action(self, state, action), oriented_action(self, state, action)
+#       - turn an action the way transposition_string() turns the board, and back;
+#         for storing actions in a transposition table
 #    cutoff_test(self, state, depth)
 #       - indicate if this state and depth is suitable to limit depth of search
+#    draft(self, state, depth)
+#       - how many more levels the search goes below this state and depth
 #    eval(self, state)
 #       - gives an indication about who might win at the state
 #    congratulate(self, state):
 #         - Called at the end of a game, display some text to the console.
 
-import random as rand
+import ttt_core
+
+# how the cells are shown on the console
+BLANK = ' '
+X = 'X'
+O = 'O'
 
 
 class GameState(object):
@@ -27,12 +53,13 @@ class GameState(object):
         TicTacToe has a 3x3 game board, and players alternately place X or O in
         a blank cell.  
 
+        The cells are numbered 0 to 8, row by row: the cell in row r, column c
+        (both counting from 1) is number (r-1)*3 + (c-1).
+
         The object has the following attributes:
-            self.gameState - a dictionary with
-                              keys: (row, col) 
-                              values: blank, X, O
-            self.blanks - a list of (row,col) tuples that are currently blanks
-                        - storing this makes calculating actions a bit faster
+            self.bits - an integer with bit i set if there's an X in cell i,
+                        and bit 9+i set if there's an O in cell i
+                      - storing this makes copying and comparing boards very fast
             self.maxs_turn - a boolean value, True if it's Max's turn
                            - storing this makes deciding whose turn it is a bit faster
             self.cachedWin - a boolean value, True if one of the players has won
@@ -40,26 +67,17 @@ class GameState(object):
             self.cachedWinner - if cachedWin is True, this is a Boolean (True: Win for Max)
                                 None if cachedWin is False
                               - stored to make some calculations faster
-            self.stringified - a unique string representation of the gameState
         """
 
-    # make some class-wide constants available for quicker calculations
-    _ablank = ' '
-    _anX = 'X'
-    _anO = 'O'
+    # a state is just these, so don't give every state a __dict__ as well
+    # (a subclass needs __slots__ of its own to keep it that way)
+    __slots__ = ('bits', 'maxs_turn', 'cachedWin', 'cachedWinner')
 
     def __init__(self):
         """ Create a new game state object.
         """
-        # the gameState dictionary stores the position of each piece
-
-        self.gameState = dict()
-        for r in range(1, 4):
-            for c in range(1, 4):
-                self.gameState[r, c] = self._ablank
-
-        # the blanks show what's left to choose from
-        self.blanks = {v for v in self.gameState}
+        # the bits store the position of each piece; the board starts empty
+        self.bits = 0
 
         # a boolean to store if it's Max's turn; True by default
         self.maxs_turn = True
@@ -72,47 +90,42 @@ class GameState(object):
         # True means Max won; False means Min won
         self.cachedWinner = None
 
-        # now cache the string that represents this state
-        self.stringified = str(self)
-
     def myclone(self):
         """ Make and return an exact copy of the state.
         """
         new_state = GameState()
-        for rc in self.gameState:
-            new_state.gameState[rc] = self.gameState[rc]
-        # copy the data not the reference
-        new_state.blanks = {v for v in self.blanks}
+        # the bits are an int, so they are immutable, like the rest
+        new_state.bits = self.bits
         new_state.maxs_turn = self.maxs_turn
         new_state.cachedWin = self.cachedWin
         new_state.cachedWinner = self.cachedWinner
-        new_state.stringified = self.stringified  # copy the reference not the string
 
         return new_state
 
     def display(self):
         """ Present the game state to the console.
         """
-        for r in range(1, 4):
+        for r in range(3):
             print("+-+-+-+")
             print("|", end="")
-            for c in range(1, 3):
-                print(self.gameState[r, c], end="")
+            for c in range(2):
+                print(self._token(r*3 + c), end="")
                 print("|", end="")
-            print(self.gameState[r, 3], end="")
+            print(self._token(r*3 + 2), end="")
             print("|")
         print("+-+-+-+")
 
-    def __str__(self):
-        """ Translate the board description into a string.  
-            Could be used as a key for a hash table.  
-            :return: A string that describes the board in the current state.
+    def _token(self, i):
+        """ Describe what's in the given cell with a single character.
+            :param: i: a cell number, 0 to 8
+            :return: X, O, or blank
         """
-        s = ""
-        for r in range(1, 4):
-            for c in range(1, 4):
-                s += self.gameState[r, c]
-        return s
+        if (self.bits >> i) & 1:
+            return X
+        elif (self.bits >> (i + 9)) & 1:
+            return O
+        else:
+            return BLANK
 
 
 class Game(object):
@@ -120,10 +133,21 @@ class Game(object):
         implementation.  
     """
 
-    def __init__(self, depthlimit=0):
+    def __init__(self, depthlimit=0, heuristic=None):
         """ Initialization.  
+            :param depthlimit: how deep to search; 0 for no limit.  The game
+                               is over after 9 moves, so a limit of 9 or more
+                               never cuts the search off.
+            :param heuristic: a function from a state to a value in (-1, 1),
+                              to use in place of eval(); by default, eval()
+                              counts the lines each player could still win on.
+                              It must give the same value for boards that are
+                              rotations or reflections of each other, since
+                              transposition_string() gives them the same key
         """
         self.depth_limit = depthlimit
+        if heuristic is not None:
+            self.eval = heuristic
 
     def initial_state(self):
         """ Return an initial state for the game.  
@@ -150,14 +174,43 @@ class Game(object):
             :param state: a legal game state 
             :return: a boolean indicating if node is terminal
         """
-        return state.cachedWin or len(state.blanks) == 0
+        filled = (state.bits | state.bits >> 9) & ttt_core.ALL_CELLS
+        return state.cachedWin or filled == ttt_core.ALL_CELLS
 
     def actions(self, state):
         """ Returns all the legal actions in the given state.
+            An action is the number of a blank cell; who plays there
+            is up to whose turn it is.
+            :param state: a state object
+            :return: a tuple of actions legal in the given state, in ttt_core.ORDER;
+                     don't change it
+        """
+        return ttt_core.actions_bits(state.bits)
+
+    def is_legal(self, state, action):
+        """ Indicate if the given action is legal in the given state,
+            without listing all the actions.
+            :param state: a state object
+            :param action: anything, but True only for an action from actions()
+            :return: True if the action is a blank cell
+        """
+        taken = state.bits | state.bits >> 9
+        return action in ttt_core.ORDER and not (taken >> action) & 1
+
+    def capture_actions(self, state):
+        """ Returns the legal actions that capture a piece.
+            :param state: a state object
+            :return: an empty list; nothing is ever captured in TicTacToe
+        """
+        return []
+
+    def is_capture(self, state, action):
+        """ Indicate if the given action captures a piece.
             :param state: a state object
-            :return: a list of actions legal in the given state
+            :param action: an action legal in the given state
+            :return: False; nothing is ever captured in TicTacToe
         """
-        return [(state.maxs_turn, b) for b in state.blanks]
+        return False
 
     def result(self, state, action):
         """ Return the state that results from the application of the
@@ -166,28 +219,48 @@ class Game(object):
             :param action: a legal action in the game state
             :return: a new game state
         """
-        # make a clone of this state
+        # make a clone of this state, and apply the action to the clone
         new_state = state.myclone()
+        self.make(new_state, action)
 
-        # interpret the given action, as defined in self.actions()
-        who, where = action
+        return new_state
 
-        # update the clone state, using the information in action
-        new_state.blanks.remove(where)
-        if who:
-            new_state.gameState[where] = state._anX
-        else:
-            new_state.gameState[where] = state._anO
+    def make(self, state, action):
+        """ Apply the given action to the given state, changing it in place.
+            Cheaper than result(), because nothing is copied; searches
+            should make() an action, search below it, then unmake() it.
+            :param state: a legal game state, to be mutated
+            :param action: a legal action in the game state
+            :return: an undo record, to give back to unmake()
+        """
+        # interpret the given action, as defined in self.actions()
+        who = state.maxs_turn
+        undo = (state.bits, state.cachedWin, state.cachedWinner)
 
-        new_state.maxs_turn = not state.maxs_turn
+        # update the state, using the information in action
+        state.bits, won = ttt_core.result_bits(state.bits, action, who)
+        state.maxs_turn = not who
 
-        # check if the move was a winning move here
-        self._cache_winner(who, where, new_state)
+        # if the move was a winning move, remember it
+        if won:
+            state.cachedWin = True
+            state.cachedWinner = who
+        return undo
 
-        # now, finally, create the stringification
+    def unmake(self, state, undo):
+        """ Take back the action that make() applied to the given state.
+            :param state: the game state given to make()
+            :param undo: the record returned by make()
+        """
+        state.bits, state.cachedWin, state.cachedWinner = undo
+        state.maxs_turn = not state.maxs_turn
 
-        new_state.stringified = str(new_state)
-        return new_state
+    def null_move_allowed(self, state):
+        """ Indicate if a search may try a null move in the given state.
+            :param state: a legal game state
+            :return: False; there is no passing in TicTacToe
+        """
+        return False
 
     def utility(self, state):
         """ Calculate the utility of the given state.
@@ -196,12 +269,23 @@ class Game(object):
             In TicTacToe, we use the following:
                  1 if win for X, -1 for win for O, 0 for draw
         """
-        if state.cachedWin and state.cachedWinner:
-            return 1
-        elif state.cachedWin and not state.cachedWinner:
-            return -1
+        if state.maxs_turn:
+            return self.side_to_move_utility(state)
         else:
+            return -self.side_to_move_utility(state)
+
+    def side_to_move_utility(self, state):
+        """ Calculate the utility of the given state for the player to move.
+            :param state: a legal game state
+            :return: utility of the terminal state
+            1 if the player to move won, -1 if they lost, 0 for draw
+        """
+        if not state.cachedWin:
             return 0
+        elif state.cachedWinner == state.maxs_turn:
+            return 1
+        else:
+            return -1
 
     def cutoff_test(self, state, depth):
         """
@@ -218,6 +302,19 @@ class Game(object):
 
         return self.depth_limit > 0 and depth > self.depth_limit
 
+    def draft(self, state, depth):
+        """ Count how many more levels the search goes below this state.
+            :param state: a game state
+            :param depth: the depth of the state, as given to cutoff_test()
+            :return: an integer; less than 1 if the search stops here
+        """
+        # no limit, or one of 9 or more, never cuts off before the game is over:
+        # then every state is searched to the end, as deep as any limit could ask
+        if 0 < self.depth_limit < 9:
+            return self.depth_limit - depth
+        else:
+            return 9
+
     def eval(self, state):
         """
             When a depth limit is applied, we need to evaluate the
@@ -226,11 +323,8 @@ class Game(object):
             :return: a numeric value in the range of the utility function
         """
         # in a game this simple, we don't really need eval().
-        # in a more interesting game, you'd look at the board and
-        # see who seems to have the advantage
-        # here, we'll just return a random float in the range (-1, 1)
-        # this is really quite a bad eval()!
-        return rand.random()*2 - 1
+        # here, we look at the board to see who seems to have the advantage
+        return ttt_core.eval_bits(state.bits)
 
     def congratulate(self, state):
         """ Called at the end of a game, display some appropriate 
@@ -239,72 +333,45 @@ class Game(object):
         """
         winstring = 'Congratulations, {} wins (utility: {})'
         if state.cachedWin and state.cachedWinner:
-            print(winstring.format(state._anX, self.utility(state)))
+            print(winstring.format(X, self.utility(state)))
         elif state.cachedWin and not state.cachedWinner:
-            print(winstring.format(state._anO, self.utility(state)))
+            print(winstring.format(O, self.utility(state)))
         else:
             print('Draw')
 
         return  # not really needed, but indicates the end of the method
 
     def transposition_string(self, state):
-        """ Returns a unique string for the given state.
+        """ Returns a key for the given state: an integer with the bits of the
+            board, and whose turn it is in the lowest bit.  Boards that are
+            rotations or reflections of each other have the same value, so
+            they share a key: the smallest of the 8 ways to turn the board.
+            :param state: a legal game state
+        """
+        return (ttt_core.canonical_bits(state.bits) << 1) | state.maxs_turn
+
+    def canonical_action(self, state, action):
+        """ Turn an action the same way transposition_string() turns the board,
+            so that it can be stored under the state's key.
+            :param state: a legal game state
+            :param action: an action legal in the given state
+            :return: the action on the turned board
+        """
+        return ttt_core.SYMMETRIES[ttt_core.canonical_symmetry(state.bits)][action]
+
+    def oriented_action(self, state, action):
+        """ Undo canonical_action(): turn an action stored under the state's key
+            back to the way the given state's board is turned.
             :param state: a legal game state
+            :param action: an action from canonical_action(), for a state with the same key
+            :return: the action on the given state's board
         """
-        return state.stringified  # because we only want to do this once
+        return ttt_core.INVERSES[ttt_core.canonical_symmetry(state.bits)][action]
 
     def action_to_string(self, action):
         """ To make actions look nice when sent to the console.
             :param: action: an action as created by actions()
             :return: a string
         """
-        who, (r, c) = action
-        return "row {}, col {}".format(r, c)
-
-    # all remaining methods are to assist in the calculations
-
-    def _cache_winner(self, who, where, state):
-        """ Look at the board and check if the new move was a winner.
-            If we look right after a move, we can reduce the effort 
-            needed to check.  We only have to look at the triplets
-            passing through the move!
-            :param: who
-            :param: where
-            :param state: a legal game state
-            :return:
-        """
-        # where is a tuple (row, col)
-        recent_r, recent_c = where
-
-        # because we know who just moved, we only have to
-        # check for wins for that player
-        if who:
-            token = state._anX
-        else:
-            token = state._anO
-
-        # check row and column and up to 2 diagonals
-        # we'll just set a flag if we find a win
-        if all([state.gameState[r, recent_c] == token for r in range(1, 4)]):
-            # check the column through recent_c
-            won = True
-        elif all([state.gameState[recent_r, c] == token for c in range(1, 4)]):
-            # check the row through recent_r
-            won = True
-        elif recent_r == recent_c \
-                and all([state.gameState[d, d] == token for d in range(1, 4)]):
-            # check the down diagonal
-            won = True
-        elif recent_r + recent_c == 4 \
-                and all([state.gameState[d, 4-d] == token for d in range(1, 4)]):
-            # check the up diagonal
-            won = True
-        else:
-            won = False
-
-        # now use the flag to set the appropriate information in the state
-        if won:
-            state.cachedWin = True
-            state.cachedWinner = who
-
-        return  # not really needed, but indicates the end of the method
+        r, c = divmod(action, 3)
+        return "row {}, col {}".format(r+1, c+1)
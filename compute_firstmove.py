@@ -1,23 +1,33 @@
 import Players
-import Minimax as Searcher
-#import AlphaBeta_Full as Searcher
+#import Minimax as Searcher
+import AlphaBeta_Full as Searcher
 import TicTacToe as Game
 #import SithVRebels as Game
 
 # to generate the table, we'll create a list for the input depths
 list_of_depths = [1, 2, 3]
 
+# one game and one searcher for all the depths, so that each search can use
+# what the shallower ones left in the transposition table
+game = Game.Game()
+searcher = Searcher.Minimax(game)
+
 for depth in list_of_depths:
 
     print('Running depth', depth)
-    # create the game, and the initial state
-    game = Game.Game(depthlimit=depth)
+    # set the depth, and create the initial state
+    game.depth_limit = depth
     state = game.initial_state()
 
     # set up the player
-    current_player = Players.VerboseComputer(game, Searcher.Minimax(game))
+    current_player = Players.VerboseComputer(game, searcher)
     current_player.ask_move(state)
 
+    # or solve the whole game once, and look the moves up (ignores the depth limit)
+    # import precompute
+    # current_player = Players.VerboseComputer(game, precompute.TableSearcher(game))
+    # current_player.ask_move(state)
+
     # print('Running full AlphaBeta depth', depth)
     # create the game, and the initial state
     # game = Game.Game(depthlimit=depth)
@@ -28,3 +38,17 @@ for depth in list_of_depths:
     # current_player = Players.VerboseComputer(game, searcher2)
     # current_player.ask_move(state)
     # print('Table size:', len(searcher2.transposition_table))
+
+# check that the shared table doesn't change the answer: after a search with
+# a depth limit of 1, one with the game's default limit must agree with a
+# searcher that starts with an empty table
+game = Game.Game()
+searcher = Searcher.Minimax(game)
+game.depth_limit = 1
+searcher.minimax_decision_max(game.initial_state())
+game.depth_limit = 0
+shared = searcher.minimax_decision_max(game.initial_state())
+fresh_game = Game.Game()
+fresh = Searcher.Minimax(fresh_game).minimax_decision_max(fresh_game.initial_state())
+assert shared.value == fresh.value, 'shared searcher found {}, fresh one {}'.format(shared.value, fresh.value)
+print('Shared and fresh searchers agree:', shared.value)
@@ -0,0 +1,128 @@
+# Move generation for Sith vs Rebels, on bitboards.
+#
+# Square (r,c) of a dim x dim board is bit r*dim+c of a bitboard.
+# The functions here only take and return plain integers (and the tables
+# built by build_tables()), so they do no allocation beyond the move list.
+# A move is packed into one integer as from_sq << 8 | to_sq, which allows
+# boards of up to 16x16.
+
+import functools
+
+# the eight directions a King (or a Queen) can move in, as (row, col) steps
+DIRECTIONS = [(1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1)]
+
+
+@functools.lru_cache(maxsize=None)
+def build_tables(dim):
+    """ Precompute the bitboard masks used for move generation.
+        The tables are built once for each board size, and shared by every Game.
+        :param dim: the size of the board
+        :return: a tuple (king_attacks, rays, steps)
+            king_attacks[sq] - a mask of the squares a King on sq can reach
+            rays[d][sq] - a mask of the squares from sq (not included) to the edge
+                          of the board in direction DIRECTIONS[d]
+            steps[d] - the change in square number for one step in direction d;
+                       positive steps walk towards higher bits
+    """
+    king_attacks = []
+    rays = [[] for _ in DIRECTIONS]
+    for r in range(dim):
+        for c in range(dim):
+            king = 0
+            for d, (dr, dc) in enumerate(DIRECTIONS):
+                ray = 0
+                i = 1
+                while 0 <= r+i*dr < dim and 0 <= c+i*dc < dim:
+                    ray |= 1 << ((r+i*dr)*dim + c+i*dc)
+                    i += 1
+                rays[d].append(ray)
+                if 0 <= r+dr < dim and 0 <= c+dc < dim:
+                    king |= 1 << ((r+dr)*dim + c+dc)
+            king_attacks.append(king)
+    steps = [dr*dim + dc for dr, dc in DIRECTIONS]
+    # shared, so make them read-only
+    return tuple(king_attacks), tuple(tuple(ray) for ray in rays), tuple(steps)
+
+
+def sith_moves(sith_bb, king_attacks):
+    """ Returns a list of moves for the Sith pieces.
+        The Sith moves like a King in Chess, onto any square but another Sith.
+        :param sith_bb: the bitboard of the Sith
+        :param king_attacks: the table from build_tables()
+        :return: a list of packed moves
+    """
+    all_moves = []
+    pieces = sith_bb
+    while pieces:
+        # peel off the lowest sith
+        sq = (pieces & -pieces).bit_length() - 1
+        pieces &= pieces - 1
+        targets = king_attacks[sq] & ~sith_bb
+        while targets:
+            tgt = (targets & -targets).bit_length() - 1
+            targets &= targets - 1
+            all_moves.append(sq << 8 | tgt)
+
+    return all_moves
+
+
+def rebel_moves(rebels_bb, occ, dim, board_mask):
+    """ Returns a list of moves for the Rebel pieces.
+        The Rebel moves like a Pawn in Chess, but cannot capture.
+        :param rebels_bb: the bitboard of the Rebels
+        :param occ: the bitboard of all the pieces
+        :param dim: the size of the board
+        :param board_mask: a bitboard with every square of the board set
+        :return: a list of packed moves
+    """
+    all_moves = []
+    # every rebel steps up one row at once, onto empty squares only
+    targets = (rebels_bb << dim) & ~occ & board_mask
+    while targets:
+        tgt = (targets & -targets).bit_length() - 1
+        targets &= targets - 1
+        all_moves.append((tgt - dim) << 8 | tgt)
+
+    return all_moves
+
+
+def jedi_moves(jedi_bb, occ, sith_bb, rays, steps):
+    """ Returns a list of moves for the Jedi pieces.
+        The Jedi moves like a Queen in Chess, and can only capture Sith.
+        :param jedi_bb: the bitboard of the Jedi
+        :param occ: the bitboard of all the pieces
+        :param sith_bb: the bitboard of the Sith
+        :param rays: the table from build_tables()
+        :param steps: the table from build_tables()
+        :return: a list of packed moves
+    """
+    all_moves = []
+    pieces = jedi_bb
+    while pieces:
+        sq = (pieces & -pieces).bit_length() - 1
+        pieces &= pieces - 1
+        # 8 directions
+        for d, step in enumerate(steps):
+            ray = rays[d][sq]
+            blockers = ray & occ
+            if blockers:
+                # the nearest occupied square along the ray
+                if step > 0:
+                    nearest = (blockers & -blockers).bit_length() - 1
+                else:
+                    nearest = blockers.bit_length() - 1
+                # everything up to (and including) the nearest blocker
+                ray ^= rays[d][nearest]
+                # but only keep the blocker if it is a Sith to capture
+                if not (sith_bb >> nearest) & 1:
+                    ray ^= 1 << nearest
+            while ray:
+                tgt = (ray & -ray).bit_length() - 1
+                ray &= ray - 1
+                all_moves.append(sq << 8 | tgt)
+
+    return all_moves
+
+
+# build the tables for the standard 5x5 board as soon as the module is loaded
+build_tables(5)
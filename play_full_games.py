@@ -15,36 +15,31 @@ list_of_depths = [(1, 1)]
 for depth1, depth2 in list_of_depths:
     # create the game, and the initial state
 
-    game1 = Game.Game(depthlimit=depth1)
-    game2 = Game.Game(depthlimit=depth2)
-    state = game1.initial_state()
+    game = Game.Game()
+    state = game.initial_state()
 
-    # set up the players
-    current_player = Players.SilentComputer(game1, Searcher1.Minimax(game1))
-    other_player = Players.SilentComputer(game2, Searcher2.Minimax(game2))
-
-    # I don't think it matters which game is used
-    # but this ensures no cross talk in case I have a bug somewhere
-    current_game, other_game = game1, game2
+    # set up the players; each searcher has its own depth limit
+    current_player = Players.SilentComputer(game, Searcher1.Minimax(game, depthlimit=depth1))
+    other_player = Players.SilentComputer(game, Searcher2.Minimax(game, depthlimit=depth2))
 
     # play the game
-    while not current_game.is_terminal(state):
+    while not game.is_terminal(state):
 
         # ask the current player for a move
         choice = current_player.ask_move(state)
 
         # check the move
-        assert choice in current_game.actions(
-            state), "The action <{}> is not legal in this state".format(choice)
+        assert game.is_legal(
+            state, choice), "The action <{}> is not legal in this state".format(choice)
 
         # apply the move
-        state = current_game.result(state, choice)
+        state = game.result(state, choice)
 
         # swap the players
-        current_player, current_game, other_player, other_game = other_player, other_game, current_player, current_game
+        current_player, other_player = other_player, current_player
 
     # game's over
     print('For trial', depth1, depth2, end=': ')
-    game1.congratulate(state)
+    game.congratulate(state)
 
 # eof
@@ -0,0 +1,149 @@
+# Solve a small game completely, once, and play from a table after that.
+#
+# The minimax value of every state reachable from the initial state is
+# found by searching to the end of the game, and remembered under
+# game.transposition_string().  Choosing a move is then a lookup: the best
+# action is the one that leads to the child that is worst for the opponent.
+#
+# This only works for games with few enough states to store them all
+# (TicTacToe has 5478, and 4520 before the game is over), and whose
+# transposition_string() is enough to determine the value of a state.
+# It uses the same Game Class methods as the other searchers.
+#
+# Run this file to solve TicTacToe and save the table.
+
+import pickle
+import time as time
+
+from Minimax import SearchTerminationRecord
+
+
+def build_table(game, state, table=None):
+    """ Find the minimax value of every state reachable from the given state.
+        :param game: an object from the Game Class
+        :param state: a legal game state; searched in place, and restored
+        :param table: a dictionary of values found before, to add to
+        :return: a dictionary from transposition_string() to the value of the
+                 state, from the point of view of the player to move
+    """
+    if table is None:
+        table = dict()
+    _solve(game, state, table)
+    return table
+
+
+def _solve(game, state, table):
+    """ Return the minimax value of the given state, from the point of view
+        of the player to move, adding it and those below it to the table.
+        :param game: an object from the Game Class
+        :param state: a legal game state; searched in place, and restored
+        :param table: a dictionary of values found so far
+        :return: the value that the player to move can obtain here
+    """
+    if game.is_terminal(state):
+        # the game is over, return the utility
+        # (checked first: the key need not tell a finished game apart)
+        return game.side_to_move_utility(state)
+
+    key = game.transposition_string(state)
+    value = table.get(key)
+    if value is None:
+        for act in game.actions(state):
+            undo = game.make(state, act)
+            val = -_solve(game, state, table)
+            game.unmake(state, undo)
+            if value is None or val > value:
+                value = val
+        table[key] = value
+    return value
+
+
+def save_table(table, filename):
+    """ Write a table from build_table() to a file.
+        :param table: a dictionary from build_table()
+        :param filename: the name of the file to write
+    """
+    with open(filename, 'wb') as f:
+        pickle.dump(table, f)
+
+
+def load_table(filename):
+    """ Read a table written by save_table().
+        :param filename: the name of the file to read
+        :return: a dictionary, as from build_table()
+    """
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
+
+
+##########################################################################################
+class TableSearcher(object):
+    """ A searcher that looks the values of the moves up in a table of solved states.
+        It plays perfectly, whatever the depth limit of the game.  It has the
+        same methods as the other searchers:
+            minimax_decision_max(state)
+            minimax_decision_min(state)
+    """
+
+    def __init__(self, game, table=None):
+        """ Remember the game object, and solve the game unless a table is given.
+            :param: game: an object from the Game Class
+            :param: table: a dictionary from build_table() or load_table()
+        """
+        self.game = game
+        self.nodes_expanded = 0
+        if table is None:
+            table = build_table(game, game.initial_state())
+        self.table = table
+
+    def minimax_decision_max(self, state):
+        """ Return the move that Max should take in the given state
+            :param state: a legal game state
+            :return: a SearchTerminationRecord
+        """
+        return self.__decision(state, 1)
+
+    def minimax_decision_min(self, state):
+        """ Return the move that Min should take in the given state
+            :param state: a legal game state
+            :return: a SearchTerminationRecord
+        """
+        return self.__decision(state, -1)
+
+    def __decision(self, state, color):
+        """ Return the move that the player to move should take in the given state.
+            A state missing from the table is solved, and added to it.
+            :param state: a legal game state
+            :param color: 1 if it's Max's turn, -1 if it's Min's turn
+            :return: a SearchTerminationRecord, with the value from Max's point of view
+        """
+        start = time.perf_counter()
+        self.nodes_expanded = 0
+
+        best = None
+        best_action = None
+        for act in self.game.actions(state):
+            undo = self.game.make(state, act)
+            val = -_solve(self.game, state, self.table)
+            self.game.unmake(state, undo)
+            self.nodes_expanded += 1
+            if best is None or val > best:
+                # remember something better
+                best = val
+                best_action = act
+
+        end = time.perf_counter()
+
+        return SearchTerminationRecord(color*best, best_action, end - start, self.nodes_expanded)
+
+
+if __name__ == '__main__':
+    import TicTacToe as Game
+
+    game = Game.Game()
+    start = time.perf_counter()
+    table = build_table(game, game.initial_state())
+    print('Solved {} states in {:.4f} seconds'.format(len(table), time.perf_counter() - start))
+    save_table(table, 'TicTacToe.pickle')
+
+# eof
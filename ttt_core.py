@@ -0,0 +1,114 @@
+# The rules of TicTacToe, on a board packed into one integer.
+#
+# Bit i of the board is set if there's an X in cell i, and bit 9+i if there's
+# an O in cell i; the cell in row r, column c (both counting from 1) is number
+# (r-1)*3 + (c-1).  The functions here only take and return plain integers,
+# and look up what they can in tables built once, when the module is loaded.
+
+# a mask with a bit for each of the 9 cells
+ALL_CELLS = 0x1FF
+
+# the 8 ways to win, as masks over the 9 cells: rows, columns, then diagonals
+WIN_MASKS = (0o007, 0o070, 0o700, 0o111, 0o222, 0o444, 0o421, 0o124)
+
+# WINS[m] is True if the 9-bit mask m covers one of the ways to win
+WINS = tuple(any(m & w == w for w in WIN_MASKS) for m in range(ALL_CELLS + 1))
+
+# the order to offer the cells in: the centre, the corners, then the edges;
+# the cells on the most lines first, which helps alpha-beta search cut off early
+ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+# ACTIONS[m] is a tuple of the cells not in the 9-bit mask m, in ORDER
+ACTIONS = tuple(tuple(i for i in ORDER if not (m >> i) & 1) for m in range(ALL_CELLS + 1))
+
+
+def _symmetries():
+    """ List the 8 symmetries of the board: the 4 rotations, each with and
+        without a reflection.
+        :return: a tuple of permutations; cell i goes to cell perm[i]
+    """
+    # cell (r,c) turns to (c, 2-r), or reflects to (r, 2-c)
+    rotate = tuple(c*3 + (2-r) for r in range(3) for c in range(3))
+    reflect = tuple(r*3 + (2-c) for r in range(3) for c in range(3))
+    perms = []
+    perm = tuple(range(9))
+    for _ in range(4):
+        perms.append(perm)
+        perms.append(tuple(reflect[j] for j in perm))
+        perm = tuple(rotate[j] for j in perm)
+    return tuple(perms)
+
+
+# SYMMETRIES[k][i] is the cell that the k-th symmetry moves cell i to,
+# and INVERSES[k][j] the cell it moves to cell j
+SYMMETRIES = _symmetries()
+INVERSES = tuple(tuple(perm.index(j) for j in range(9)) for perm in SYMMETRIES)
+
+# SYMMETRY_TABLES[k][m] is the 9-bit mask m, moved by the k-th symmetry
+SYMMETRY_TABLES = tuple(tuple(sum(1 << perm[i] for i in range(9) if (m >> i) & 1)
+                              for m in range(ALL_CELLS + 1))
+                        for perm in SYMMETRIES)
+
+
+def result_bits(bits, cell, who):
+    """ Put a piece on the board.
+        :param bits: the board
+        :param cell: the number of a blank cell
+        :param who: True for X, False for O
+        :return: a pair (bits, won): the new board, and True if the move won
+    """
+    if who:
+        bits |= 1 << cell
+        return bits, WINS[bits & ALL_CELLS]
+    else:
+        bits |= 1 << (cell + 9)
+        return bits, WINS[bits >> 9]
+
+
+def actions_bits(bits):
+    """ List the blank cells of the board.
+        :param bits: the board
+        :return: a tuple of cell numbers, in ORDER; shared, so don't change it
+    """
+    return ACTIONS[(bits | bits >> 9) & ALL_CELLS]
+
+
+def eval_bits(bits):
+    """ Estimate who might win on the board: every line a player could still
+        win on counts for them, more so with more of their pieces on it.
+        :param bits: a board where nobody has won yet
+        :return: a number in (-1, 1), positive if X seems to be ahead
+    """
+    x_bits = bits & ALL_CELLS
+    o_bits = bits >> 9
+    value = 0
+    for mask in WIN_MASKS:
+        if not o_bits & mask:
+            value += (x_bits & mask).bit_count() ** 2
+        if not x_bits & mask:
+            value -= (o_bits & mask).bit_count() ** 2
+    # no line has 3 pieces before the game is over, and they can't all
+    # have 2, so the total is always less than 8*2**2 = 32
+    return value / 32
+
+
+def canonical_bits(bits):
+    """ Choose one board to stand for all its rotations and reflections.
+        :param bits: the board
+        :return: the smallest of the 8 ways to turn the board
+    """
+    x_bits = bits & ALL_CELLS
+    o_bits = bits >> 9
+    return min(table[x_bits] | table[o_bits] << 9 for table in SYMMETRY_TABLES)
+
+
+def canonical_symmetry(bits):
+    """ Find the symmetry that canonical_bits() uses to turn the board.
+        :param bits: the board
+        :return: an index k into SYMMETRIES; the first one, if several turn
+                 the board the same way
+    """
+    x_bits = bits & ALL_CELLS
+    o_bits = bits >> 9
+    turned = [table[x_bits] | table[o_bits] << 9 for table in SYMMETRY_TABLES]
+    return turned.index(min(turned))